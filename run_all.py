@@ -0,0 +1,54 @@
+# Runs all three scrapers concurrently in a single process. Run separately,
+# each one pays its own Python startup and TLS handshakes and they execute
+# back to back; here the grid-status fetch overlaps the Playwright navigation
+# and the notable-outages scrape, so total wall time is the slowest scraper
+# instead of the sum of all three.
+import asyncio
+
+import aiohttp
+
+import scrape_luma_grid_status as grid_status
+import scrape_notable_outages as notable_outages
+import scrape_service_status as service_status
+
+
+async def run_grid_status(session):
+    """
+    Fetches the system-overview page over the shared aiohttp session and
+    publishes the parsed results (the Supabase client is synchronous, so the
+    publish runs in a worker thread).
+    """
+    async with session.get(grid_status.URL) as response:
+        response.raise_for_status()
+        content = await response.read()
+
+    results = grid_status.parse_grid_status(content)
+    print("Grid status results:")
+    print(results)
+    await asyncio.to_thread(grid_status.publish_results_to_db, results)
+
+
+async def run_notable_outages():
+    """
+    Runs the notable-outages scraper (plain requests with a Selenium
+    fallback, both synchronous) in a worker thread.
+    """
+    await asyncio.to_thread(notable_outages.main)
+
+
+async def main():
+    async with aiohttp.ClientSession(
+        headers={
+            # Avoid the 403 Forbidden error by the website by using a user-agent header
+            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/123.0 Safari/537.36"
+        },
+        connector=aiohttp.TCPConnector(limit=8, keepalive_timeout=30),
+    ) as session:
+        async with asyncio.TaskGroup() as tg:
+            tg.create_task(run_grid_status(session))
+            tg.create_task(service_status.main())
+            tg.create_task(run_notable_outages())
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,8 +1,13 @@
-# For scraping using BeautifulSoup and requests 
+# For scraping using requests and lxml
+import atexit
+import re
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import lxml.html
+from lxml import etree
 from datetime import datetime
-import pytz
+from zoneinfo import ZoneInfo
 # For publishing to the database using Supabase
 from supabase import create_client, Client
 from datetime import datetime
@@ -17,6 +22,42 @@ except ImportError:
 
 
 URL = "https://lumapr.com/system-overview/?lang=en"
+
+# Load the tz data once instead of on every scrape; zoneinfo also avoids the
+# pytz dependency entirely on 3.9+
+_PR_TZ = ZoneInfo("America/Puerto_Rico")
+
+# Reuse one session across scrapes so the TLS handshake and connection are
+# only paid once (connection pooling + keep-alive via urllib3)
+_SESSION = requests.Session()
+_SESSION.headers.update({
+    # Avoid the 403 Forbidden error by the website by using a user-agent header
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/123.0 Safari/537.36"
+})
+_SESSION.mount("https://", HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=4,
+    max_retries=Retry(total=3, backoff_factor=0.5),
+))
+atexit.register(_SESSION.close)
+
+# Compiled XPath expressions so the selectors are only parsed once. The first
+# one grabs all four target divs in a single walk of the tree instead of one
+# soup.find() walk per id.
+_TARGET_DIVS = etree.XPath(
+    "//div[@id='total-Generation' or @id='next-Hour-Forecast'"
+    " or @id='reserve' or @id='peak-Forecast']"
+)
+_MAX_SPANS = etree.XPath(".//span[contains(@class, 'max-text')]")
+_PEAK_PARAGRAPHS = etree.XPath(".//p[contains(@class, 'peak-text')]")
+
+# Matches the numeric part of values like "3,000MW", ignoring whitespace and
+# unit suffixes in one pass instead of chained str.replace calls
+_DIGITS = re.compile(r"-?[\d,]+")
+
+def _to_int(text):
+    match = _DIGITS.search(text)
+    return int(match.group().replace(",", "")) if match else None
 SUPABASE_URL = os.environ.get("SUPABASE_URL")
 SUPABASE_KEY = os.environ.get("SUPABASE_KEY")
 # print(f"URL: {SUPABASE_URL[0:5]}")  # Print only part of the key for security
@@ -34,17 +75,12 @@ else:
 
     pass
 
-def scrape_luma():
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/123.0 Safari/537.36"
-    }
-    # Avoid the 403 Forbidden error by the website by using a user-agent header
-    response = requests.get(URL, headers=headers)
-
-    if response.status_code != 200:
-        raise Exception(f"Failed to fetch page: {response.status_code}")
-
-    soup = BeautifulSoup(response.text, 'html.parser')
+def parse_grid_status(content):
+    """Parse the system-overview HTML (bytes) into the results dict"""
+    # Parse the raw bytes with lxml (handles encoding detection itself) and
+    # collect all four target divs in one pass over the tree
+    tree = lxml.html.fromstring(content)
+    divs = {div.get("id"): div for div in _TARGET_DIVS(tree)}
 
    # Define the IDs and their corresponding result keys
     target_ids = {
@@ -56,13 +92,13 @@ def scrape_luma():
     results = {}
 
     for div_id, key in target_ids.items():
-        div = soup.find("div", id=div_id)
-        if div:
+        div = divs.get(div_id)
+        if div is not None:
             # Current value from data-value
-            current = int(div['data-value']) if div.has_attr('data-value') else None
+            current = int(div.get('data-value')) if div.get('data-value') is not None else None
             # Max value from span.max-text
-            max_span = div.find("span", class_="max-text")
-            max_val = int(max_span.get_text(strip=True)) if max_span else None
+            max_spans = _MAX_SPANS(div)
+            max_val = int(max_spans[0].text_content().strip()) if max_spans else None
 
             results[key] = current
             results[f"{key}_max"] = max_val
@@ -71,24 +107,31 @@ def scrape_luma():
             results[f"{key}_max"] = None
 
     # Extract peak demand and peak reserve from the "peak-Forecast" section
-    peak_div = soup.find("div", id="peak-Forecast")
-    if peak_div:
-        peak_values = peak_div.find_all("p", class_="peak-text")
+    peak_div = divs.get("peak-Forecast")
+    if peak_div is not None:
+        peak_values = _PEAK_PARAGRAPHS(peak_div)
         if len(peak_values) >= 2:
-            results["peak_demand_forecast"] = int(peak_values[0].get_text(strip=True).replace("MW", ""))
-            results["peak_reserve_forecast"] = int(peak_values[1].get_text(strip=True).replace("MW", ""))
+            results["peak_demand_forecast"] = _to_int(peak_values[0].text_content())
+            results["peak_reserve_forecast"] = _to_int(peak_values[1].text_content())
         else:
             results["peak_demand_forecast"] = None
             results["peak_reserve_forecast"] = None
     else:
         results["peak_demand_forecast"] = None
-        results["peak_reserve_forecast"] = None    
+        results["peak_reserve_forecast"] = None
 
     # Add timestamp
-    puerto_rico_tz = pytz.timezone("America/Puerto_Rico")
-    results["timestamp"] = datetime.now(puerto_rico_tz).isoformat() 
+    results["timestamp"] = datetime.now(_PR_TZ).isoformat()
     return results
 
+def scrape_luma():
+    response = _SESSION.get(URL, timeout=10)
+
+    if response.status_code != 200:
+        raise Exception(f"Failed to fetch page: {response.status_code}")
+
+    return parse_grid_status(response.content)
+
 def publish_results_to_db(results):
 
     supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
@@ -2,6 +2,8 @@ import os
 import time
 import hashlib
 from datetime import datetime
+import requests
+import lxml.html
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service
@@ -15,30 +17,95 @@ from supabase import create_client, Client
 supabase_url = os.environ.get("SUPABASE_URL")
 supabase_key = os.environ.get("SUPABASE_KEY")
 
+URL = "https://lumapr.com/notable-outages/?lang=en"
+HEADERS = {
+    # Avoid the 403 Forbidden error by the website by using a user-agent header
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/123.0 Safari/537.36"
+}
+
+# The outage/restoration timestamps come back like "May 13 10:00'"
+_OUTAGE_TIME_FORMAT = '%B %d %H:%M\''
+# Many rows share the same timestamp strings, so memoize the parses
+_PARSE_CACHE = {}
+
+def _parse_outage_time(text, year):
+    """Parse an outage-table timestamp, returning None if it doesn't match"""
+    if text not in _PARSE_CACHE:
+        try:
+            # Add the given year since it's not in the string
+            _PARSE_CACHE[text] = datetime.strptime(text, _OUTAGE_TIME_FORMAT).replace(year=year)
+        except ValueError:
+            _PARSE_CACHE[text] = None
+    return _PARSE_CACHE[text]
+
+# Resolved lazily now that Selenium is only the fallback path; the plain HTTP
+# path shouldn't pay for a chromedriver version check.
+_DRIVER_PATH = None
+
+def _get_driver_path():
+    """Resolve the chromedriver path once and cache it.
+
+    ChromeDriverManager().install() checks the network for a new driver
+    version on every call, which adds seconds before any scraping starts.
+    Set CHROMEDRIVER_PATH (e.g. in GitHub Actions after pre-installing
+    chromedriver) to skip the install() call entirely.
+    """
+    global _DRIVER_PATH
+    if _DRIVER_PATH is None:
+        _DRIVER_PATH = os.environ.get("CHROMEDRIVER_PATH") or ChromeDriverManager().install()
+    return _DRIVER_PATH
+
 def setup_driver():
     """Set up a headless Chrome browser"""
     chrome_options = Options()
     chrome_options.add_argument("--headless")
     chrome_options.add_argument("--no-sandbox")
     chrome_options.add_argument("--disable-dev-shm-usage")
-    
+    chrome_options.add_argument("--disable-extensions")
+    # Don't wait for subresources to finish loading; we wait for the table
+    # explicitly below anyway
+    chrome_options.page_load_strategy = "eager"
+
     # For GitHub Actions environment
     if os.environ.get("GITHUB_ACTIONS"):
         chrome_options.add_argument("--disable-gpu")
         chrome_options.add_argument("--window-size=1920,1080")
-        
-    service = Service(ChromeDriverManager().install())
+
+    service = Service(_get_driver_path())
     driver = webdriver.Chrome(service=service, options=chrome_options)
     return driver
 
-def scrape_luma_outages():
-    """Scrape outage data from LUMA PR website using Selenium"""
-    url = "https://lumapr.com/notable-outages/?lang=en"
-    
+def fetch_outage_rows():
+    """Fetch the outage table straight over HTTP and parse it with lxml.
+
+    If the table rows are server-rendered this skips headless Chrome
+    entirely (milliseconds instead of seconds). Returns a list of
+    cell-text lists, or None if the rows aren't in the static HTML and we
+    need the Selenium fallback.
+    """
+    try:
+        response = requests.get(URL, headers=HEADERS, timeout=10)
+        response.raise_for_status()
+    except requests.RequestException as e:
+        print(f"HTTP fetch failed: {e}")
+        return None
+
+    tree = lxml.html.fromstring(response.content)
+    rows = tree.xpath("//div[contains(@class, 'dataTables_scrollBody')]//table/tbody/tr")
+    if not rows:
+        # Before DataTables initializes, the rows live in the plain table
+        rows = tree.xpath("//table[contains(@class, 'wpDataTable')]/tbody/tr")
+    if not rows:
+        return None
+
+    return [[cell.text_content().strip() for cell in row.xpath("./td")] for row in rows]
+
+def fetch_outage_rows_with_selenium():
+    """Fetch the outage table with headless Chrome (fallback for JS-rendered rows)"""
     try:
         driver = setup_driver()
-        driver.get(url)
-        
+        driver.get(URL)
+
         # Wait for the table to be loaded
         WebDriverWait(driver, 30).until(
             EC.presence_of_element_located((By.CSS_SELECTOR, "div.dataTables_scrollBody table tbody tr"))
@@ -47,64 +114,77 @@ def scrape_luma_outages():
         # Give a little extra time for all data to render
         time.sleep(3)
         
-        # Find all table rows
-        rows = driver.find_elements(By.CSS_SELECTOR, "div.dataTables_scrollBody table tbody tr")
-        
-        outages = []
-        for row in rows:
-            cells = row.find_elements(By.TAG_NAME, "td")
-            if len(cells) >= 7:
-                municipality = cells[0].text.strip()
-                sector = cells[1].text.strip()
-                outage_reported = cells[2].text.strip()
-                est_restoration = cells[3].text.strip()
-                customers_impacted = cells[4].text.strip()
-                category = cells[5].text.strip()
-                current_status = cells[6].text.strip()
-                
-                # Create a unique ID based on municipality, sector and outage time
-                unique_id = hashlib.md5(f"{municipality}_{sector}_{outage_reported}".encode()).hexdigest()
-                
-                # Parse dates
-                try:
-                    outage_time = datetime.strptime(outage_reported, '%B %d %H:%M\'')
-                    # Add current year since it's not in the string
-                    outage_time = outage_time.replace(year=datetime.now().year)
-                except ValueError:
-                    outage_time = None
-                
-                try:
-                    restoration_time = datetime.strptime(est_restoration, '%B %d %H:%M\'')
-                    # Add current year since it's not in the string
-                    restoration_time = restoration_time.replace(year=datetime.now().year)
-                except ValueError:
-                    restoration_time = None
-                
-                outage_data = {
-                    "id": unique_id,
-                    "municipality": municipality,
-                    "sector": sector,
-                    "outage_reported_text": outage_reported,
-                    "outage_reported_timestamp": outage_time.isoformat() if outage_time else None,
-                    "restoration_estimated_text": est_restoration,
-                    "restoration_estimated_timestamp": restoration_time.isoformat() if restoration_time else None,
-                    "customers_impacted": customers_impacted,
-                    "category": category,
-                    "current_status": current_status,
-                    "scraped_at": datetime.now().isoformat()
-                }
-                
-                outages.append(outage_data)
-        
+        # Pull the text of every cell in one JavaScript call. Each
+        # find_elements()/.text access is a synchronous WebDriver round-trip,
+        # so extracting 7 cells per row that way costs 7N+1 round-trips;
+        # this returns the whole table as a list of lists in a single one.
+        raw_rows = driver.execute_script("""
+            return Array.from(document.querySelectorAll('div.dataTables_scrollBody table tbody tr'))
+                .map(r => Array.from(r.querySelectorAll('td')).map(c => c.innerText.trim()));
+        """)
+
         driver.quit()
-        return outages
-    
+        return raw_rows
+
     except Exception as e:
         print(f"Error scraping data: {e}")
         if 'driver' in locals():
             driver.quit()
         return []
 
+def scrape_luma_outages():
+    """Scrape outage data from LUMA PR website"""
+    # Try plain HTTP first; only start a browser if the rows turn out to be
+    # rendered client-side
+    raw_rows = fetch_outage_rows()
+    if raw_rows is None:
+        print("Outage table not in the static HTML, falling back to Selenium")
+        raw_rows = fetch_outage_rows_with_selenium()
+
+    # One timestamp for the whole batch instead of datetime.now() per row
+    current_year = datetime.now().year
+    scraped_at = datetime.now().isoformat()
+
+    outages = []
+    for cells in raw_rows:
+        if len(cells) >= 7:
+            municipality = cells[0]
+            sector = cells[1]
+            outage_reported = cells[2]
+            est_restoration = cells[3]
+            customers_impacted = cells[4]
+            category = cells[5]
+            current_status = cells[6]
+
+            # Create a unique ID based on municipality, sector and outage time.
+            # blake2b is faster than md5 and a 16-byte digest keeps the same
+            # 32-char hex length the id column already stores.
+            unique_id = hashlib.blake2b(
+                f"{municipality}_{sector}_{outage_reported}".encode(), digest_size=16
+            ).hexdigest()
+
+            # Parse dates
+            outage_time = _parse_outage_time(outage_reported, current_year)
+            restoration_time = _parse_outage_time(est_restoration, current_year)
+
+            outage_data = {
+                "id": unique_id,
+                "municipality": municipality,
+                "sector": sector,
+                "outage_reported_text": outage_reported,
+                "outage_reported_timestamp": outage_time.isoformat() if outage_time else None,
+                "restoration_estimated_text": est_restoration,
+                "restoration_estimated_timestamp": restoration_time.isoformat() if restoration_time else None,
+                "customers_impacted": customers_impacted,
+                "category": category,
+                "current_status": current_status,
+                "scraped_at": scraped_at
+            }
+
+            outages.append(outage_data)
+
+    return outages
+
 def store_outages_in_supabase(outages):
     supabase = create_client(supabase_url, supabase_key)
 
@@ -113,26 +193,12 @@ def store_outages_in_supabase(outages):
         return
     
     try:
-        # Get existing outage IDs to determine which are new
-        existing_outages = supabase.table("luma_outages").select("id").execute()
-        existing_ids = {item['id'] for item in existing_outages.data}
-        
-        # Separate new and existing outages
-        new_outages = [o for o in outages if o['id'] not in existing_ids]
-        update_outages = [o for o in outages if o['id'] in existing_ids]
-        
-        # Insert new outages
-        if new_outages:
-            result = supabase.table("luma_outages").insert(new_outages).execute()
-            print(f"Inserted {len(new_outages)} new outages")
-        
-        # Update existing outages (mainly for status changes)
-        for outage in update_outages:
-            result = supabase.table("luma_outages").update(outage).eq("id", outage['id']).execute()
-        
-        if update_outages:
-            print(f"Updated {len(update_outages)} existing outages")
-            
+        # Upsert everything in one round-trip: PostgREST turns this into a
+        # single INSERT ... ON CONFLICT (id) DO UPDATE, so we no longer need
+        # the existing-id SELECT or one UPDATE request per changed outage
+        result = supabase.table("luma_outages").upsert(outages, on_conflict="id").execute()
+        print(f"Upserted {len(outages)} outages")
+
     except Exception as e:
         print(f"Error storing data in Supabase: {e}")
 
@@ -0,0 +1,12 @@
+-- Adds a typed, indexed copy of outage_snapshot.last_update so Postgres can
+-- compare timestamps directly (using the index) instead of reparsing the
+-- text column on every insert_if_newer call.
+-- Run this once in the Supabase SQL editor, before the updated
+-- insert_if_newer.sql.
+alter table outage_snapshot add column last_update_ts timestamptz;
+create index on outage_snapshot (last_update_ts desc);
+
+-- Backfill existing rows from the text column
+update outage_snapshot
+set last_update_ts = to_timestamp(last_update, 'MM/DD/YYYY HH12:MI AM')
+where last_update_ts is null;
@@ -0,0 +1,21 @@
+-- Inserts an outage_snapshot row only when p_last_update_ts is newer than the
+-- newest row already stored. Called from scrape_service_status.py via
+-- supabase.rpc('insert_if_newer', ...) so the check and the insert happen in
+-- a single round-trip instead of a SELECT followed by an INSERT. The
+-- comparison runs against the indexed last_update_ts column (see
+-- add_last_update_ts.sql), so nothing reparses the text timestamps.
+-- Run this once in the Supabase SQL editor, after add_last_update_ts.sql.
+drop function if exists insert_if_newer(text, jsonb);
+
+create or replace function insert_if_newer(p_last_update_ts timestamptz, p_row jsonb)
+returns boolean
+language sql
+as $$
+  insert into outage_snapshot
+  select * from jsonb_populate_record(null::outage_snapshot, p_row)
+  where not exists (
+    select 1 from outage_snapshot
+    where last_update_ts >= p_last_update_ts
+  )
+  returning true;
+$$;